@@ -19,9 +19,9 @@ def write_output(content: str, output_path: Path) -> None:
 
         # Write the content to the file
         output_path.write_text(content)
-        logger.info(f"Output written to: {output_path}")
+        logger.info("Output written to: %s", output_path)
     except Exception as e:
-        logger.error(f"Error writing to output file: {e}")
+        logger.error("Error writing to output file: %s", e)
         raise
 
 
@@ -57,7 +57,7 @@ def cli() -> None:
     )
 
     if not args.file.exists():
-        logger.error(f"Configuration file not found: {args.file}")
+        logger.error("Configuration file not found: %s", args.file)
         sys.exit(1)
 
     try:
@@ -72,7 +72,7 @@ def cli() -> None:
         else:
             print(result)
     except Exception as e:
-        logger.error(f"Error processing queries: {e}")
+        logger.error("Error processing queries: %s", e)
         sys.exit(1)
 
 
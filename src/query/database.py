@@ -1,19 +1,73 @@
 import csv
 import json
 import logging
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from io import StringIO
-from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-import mysql.connector
-import requests
+try:
+    import orjson as _json
+except ImportError:
+    _json = json
 
 from .dataclass import AdapterSettings
 
+if TYPE_CHECKING:
+    import urllib3
+
+# Driver packages (mysql.connector, urllib3) are imported where they are
+# used so runs that only touch sqlite don't pay for loading them
+
 logger = logging.getLogger(__name__)
 
 
+def iter_statements(script: Union[str, Iterable[str]]) -> Iterator[str]:
+    """
+    Yield the non-empty ';'-separated statements of a rendered query.
+    The query may also be given as an iterable of text chunks, such as the
+    output of Template.generate(), so the full rendered text is never built
+    as one string.
+    """
+    if isinstance(script, str):
+        script = (script,)
+    # Chunks of the statement in progress; only joined once its ';' arrives
+    pending: List[str] = []
+    for chunk in script:
+        if ";" not in chunk:
+            pending.append(chunk)
+            continue
+        first, *parts = chunk.split(";")
+        pending.append(first)
+        parts.insert(0, "".join(pending))
+        pending = [parts.pop()]
+        for part in parts:
+            statement = part.strip()
+            if statement:
+                yield statement
+    statement = "".join(pending).strip()
+    if statement:
+        yield statement
+
+
+def _merge_rows(
+    results: List[Dict[str, Any]], rows: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Append rows to results, adopting rows instead of copying while results is empty."""
+    if results:
+        results.extend(rows)
+        return results
+    return rows
+
+
+def split_statements(script: Union[str, Iterable[str]]) -> List[str]:
+    """Split a rendered query on ';' into its non-empty statements."""
+    return list(iter_statements(script))
+
+
 class DatabaseConnectionBase:
     def __init__(self, settings: AdapterSettings):
         self.settings = settings
@@ -21,6 +75,18 @@ class DatabaseConnectionBase:
     def query(self, query: str) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
+    def execute_script(self, script: Union[str, Iterable[str]]) -> List[Dict[str, Any]]:
+        """Run every statement in the script and concatenate their rows."""
+        # query_many lets connections that can batch send all statements at once
+        results: List[Dict[str, Any]] = []
+        for rows in self.query_many(split_statements(script)):
+            results = _merge_rows(results, rows)
+        return results
+
+    def query_many(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        """Run several independent queries, returning the rows of each."""
+        return [self.query(query) for query in queries]
+
     def close(self) -> None:
         pass
 
@@ -30,30 +96,76 @@ class SqliteDatabaseConnection(DatabaseConnectionBase):
         super().__init__(settings)
         if not self.settings.database:
             raise ValueError("Database name must be provided for sqlite3 adapter.")
-        self._connection = None
+        # A single connection and cursor are opened on first use and kept so
+        # the page cache stays warm across queries
+        self._connection: Optional[sqlite3.Connection] = None
+        self._cursor: Optional[sqlite3.Cursor] = None
+        # Queries may run from several threads at once
+        self._lock = threading.Lock()
+
+    def _get_cursor(self) -> sqlite3.Cursor:
+        if self._cursor is None:
+            self._connection = sqlite3.connect(
+                self.settings.database, check_same_thread=False
+            )
+            self._connection.executescript(
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA temp_store=MEMORY;"
+                "PRAGMA cache_size=-64000;"
+            )
+            self._cursor = self._connection.cursor()
+        return self._cursor
 
-    @contextmanager
-    def get_connection(self):
-        conn = sqlite3.connect(self.settings.database)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+    @staticmethod
+    def _fetch_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        """Fetch all rows as dicts, resolving the column names only once."""
+        if cursor.description is None:
+            return []
+        columns = [column[0] for column in cursor.description]
+        if len(set(columns)) == len(columns):
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        # Joins can repeat a column name; like sqlite3.Row, the first one wins
+        keep = [i for i, column in enumerate(columns) if columns.index(column) == i]
+        columns = [columns[i] for i in keep]
+        return [
+            dict(zip(columns, [row[i] for i in keep])) for row in cursor.fetchall()
+        ]
 
     def query(self, query: str) -> List[Dict[str, Any]]:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
+        with self._lock:
+            cursor = self._get_cursor()
             try:
-                logger.debug(f"Executing query: {query}")
+                logger.debug("Executing query: %s", query)
                 cursor.execute(query)
-                rows = cursor.fetchall()
-                return [dict(row) for row in rows]
+                return self._fetch_dicts(cursor)
             except sqlite3.Error as e:
-                logger.error(f"SQLite error executing query: {e}")
+                logger.error("SQLite error executing query: %s", e)
                 raise
-            finally:
-                cursor.close()
+
+    def execute_script(self, script: Union[str, Iterable[str]]) -> List[Dict[str, Any]]:
+        # Render every statement before taking the lock, so templates render
+        # in parallel and a render error leaves the database untouched
+        statements = split_statements(script)
+        with self._lock:
+            cursor = self._get_cursor()
+            results = []
+            try:
+                for statement in statements:
+                    logger.debug("Executing query: %s", statement)
+                    cursor.execute(statement)
+                    results = _merge_rows(results, self._fetch_dicts(cursor))
+                return results
+            except sqlite3.Error as e:
+                logger.error("SQLite error executing query: %s", e)
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection:
+                self._cursor.close()
+                self._connection.close()
+                self._connection = None
+                self._cursor = None
 
 
 class MysqlDatabaseConnection(DatabaseConnectionBase):
@@ -78,10 +190,11 @@ class MysqlDatabaseConnection(DatabaseConnectionBase):
             "pool_reset_session": True,  # Ensure sessions are reset when returned to pool
         }
         self.pool = None
-        self._active_connections = set()
         self._setup_connection_pool()
 
     def _setup_connection_pool(self):
+        import mysql.connector
+
         pool_name = self.config.pop("pool_name")
         pool_size = 5
         self.pool = mysql.connector.pooling.MySQLConnectionPool(
@@ -91,15 +204,15 @@ class MysqlDatabaseConnection(DatabaseConnectionBase):
     @contextmanager
     def get_connection(self):
         conn = self.pool.get_connection()
-        self._active_connections.add(conn)
         try:
             yield conn
         finally:
-            if conn in self._active_connections:
-                self._active_connections.remove(conn)
+            # Closing a pooled connection hands it back to the pool
             conn.close()
 
     def query(self, query: str) -> List[Dict[str, Any]]:
+        import mysql.connector
+
         with self.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             try:
@@ -107,20 +220,41 @@ class MysqlDatabaseConnection(DatabaseConnectionBase):
                 result = cursor.fetchall()
                 return result
             except mysql.connector.Error as e:
-                logger.error(f"MySQL error executing query: {e}")
+                logger.error("MySQL error executing query: %s", e)
+                raise
+            finally:
+                cursor.close()
+
+    def execute_script(self, script: Union[str, Iterable[str]]) -> List[Dict[str, Any]]:
+        import mysql.connector
+
+        # Render every statement before checking out a connection, so a
+        # render error leaves the database untouched
+        statements = split_statements(script)
+        # All statements share one pooled connection and cursor
+        with self.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            results = []
+            try:
+                for statement in statements:
+                    logger.debug("Executing query: %s", statement)
+                    cursor.execute(statement)
+                    results = _merge_rows(results, cursor.fetchall())
+                return results
+            except mysql.connector.Error as e:
+                logger.error("MySQL error executing query: %s", e)
                 raise
             finally:
                 cursor.close()
 
     def close(self) -> None:
         if self.pool:
-            # Close any remaining active connections
-            for conn in list(self._active_connections):
-                try:
-                    conn.close()
-                    self._active_connections.remove(conn)
-                except Exception as e:
-                    logger.warning(f"Error closing connection: {e}")
+            # Connections still checked out are returned by their own
+            # get_connection() block; close the idle ones held by the pool
+            try:
+                self.pool._remove_connections()
+            except Exception as e:
+                logger.warning("Error closing connection: %s", e)
 
             # Set pool to None to ensure no new connections are created
             self.pool = None
@@ -128,6 +262,9 @@ class MysqlDatabaseConnection(DatabaseConnectionBase):
 
 class HttpDatabaseConnection(DatabaseConnectionBase):
     def __init__(self, settings: AdapterSettings):
+        import urllib.request
+        import urllib3
+
         super().__init__(settings)
         required_attrs = ["base_url", "base_path"]
         missing_attrs = [
@@ -140,39 +277,93 @@ class HttpDatabaseConnection(DatabaseConnectionBase):
 
         self.base_url = self.settings.base_url.rstrip("/")
         self.base_path = self.settings.base_path.strip("/")
-        self.http_method = getattr(self.settings, "http_method", "post").lower()
+        self.http_method = (self.settings.http_method or "post").lower()
         self.base_payload = getattr(self.settings, "base_payload", {}) or {}
         self.base_headers = getattr(self.settings, "base_headers", {}) or {}
-        self.session = requests.Session()
 
-        # Set up the session with base headers
-        self.session.headers.update(self.base_headers)
+        # One pool manager keeps TCP/TLS connections alive across queries.
+        # Like requests, honour the CA bundle and proxy environment variables.
+        pool_kwargs = {
+            "num_pools": 4,
+            "maxsize": 16,
+            "retries": urllib3.Retry(3),
+            "ca_certs": os.environ.get("REQUESTS_CA_BUNDLE")
+            or os.environ.get("CURL_CA_BUNDLE")
+            or None,
+        }
+        base_url = urlsplit(self.base_url)
+        proxy = urllib.request.getproxies().get(base_url.scheme)
+        if proxy and not urllib.request.proxy_bypass(base_url.hostname or ""):
+            logger.debug("Using proxy %s for %s", proxy, self.base_url)
+            self.http = urllib3.ProxyManager(proxy, **pool_kwargs)
+        else:
+            self.http = urllib3.PoolManager(**pool_kwargs)
 
     def _make_request(
         self, endpoint: str, payload: Dict[str, Any]
-    ) -> requests.Response:
+    ) -> "urllib3.BaseHTTPResponse":
         """Make HTTP request with the configured method."""
+        import urllib3
+
         url = f"{self.base_url}/{self.base_path}/{endpoint.lstrip('/')}"
 
         # Merge base payload with query-specific payload
         merged_payload = {**self.base_payload, **payload}
 
-        logger.debug(f"Making {self.http_method} request to {url}")
-        logger.debug(f"Payload: {merged_payload}")
+        logger.debug("Making %s request to %s", self.http_method, url)
+        logger.debug("Payload: %s", merged_payload)
 
         try:
             if self.http_method == "get":
-                response = self.session.get(url, params=merged_payload)
+                query_string = self._encode_query_string(merged_payload)
+                response = self.http.request(
+                    "GET",
+                    f"{url}?{query_string}" if query_string else url,
+                    headers=self.base_headers,
+                )
             else:  # post is default
-                response = self.session.post(url, json=merged_payload)
-
-            response.raise_for_status()
+                response = self.http.request(
+                    "POST",
+                    url,
+                    body=_json.dumps(merged_payload),
+                    headers={**self.base_headers, "Content-Type": "application/json"},
+                )
+
+            if response.status >= 400:
+                raise urllib3.exceptions.HTTPError(
+                    f"{response.status} Error: {response.reason} for url: {url}"
+                )
             return response
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"HTTP request failed: {e}")
+        except urllib3.exceptions.HTTPError as e:
+            logger.error("HTTP request failed: %s", e)
             raise
 
+    @staticmethod
+    def _encode_query_string(payload: Dict[str, Any]) -> str:
+        """Encode GET params like requests did: lists repeat the key, None is dropped."""
+        pairs = []
+        for key, values in payload.items():
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            pairs.extend((key, value) for value in values if value is not None)
+        return urlencode(pairs)
+
+    @staticmethod
+    def _decode_response(response: "urllib3.BaseHTTPResponse") -> str:
+        """Decode a response body with its Content-Type charset, defaulting to UTF-8."""
+        content_type = response.headers.get("Content-Type", "")
+        charset = "utf-8"
+        for param in content_type.split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "charset" and value.strip():
+                charset = value.strip().strip("\"'")
+        try:
+            return response.data.decode(charset)
+        except LookupError:
+            # Unknown charset names fall back to UTF-8
+            return response.data.decode("utf-8")
+
     @staticmethod
     def _parse_csv_response(response_text: str) -> List[Dict[str, Any]]:
         """Parse CSV response into list of dictionaries.
@@ -180,28 +371,17 @@ class HttpDatabaseConnection(DatabaseConnectionBase):
         try:
             if not response_text:
                 raise ValueError("Empty response")
-            result = []
-            csv_file = StringIO(response_text)
-            reader = csv.reader(csv_file)
+            reader = csv.reader(StringIO(response_text))
 
             # Get headers from first row and convert to lowercase
             headers = [header.lower() for header in next(reader)]
 
-            # Process each data row
-            for row in reader:
-                # Skip empty rows
-                if not row:
-                    continue
-                # Create dict mapping lowercase headers to row values
-                row_dict = {
-                    headers[i]: val for i, val in enumerate(row) if i < len(headers)
-                }
-                result.append(row_dict)
-
-            return result
+            # zip stops at the shorter side, dropping values without a header;
+            # empty rows are skipped
+            return [dict(zip(headers, row)) for row in reader if row]
 
         except Exception as e:
-            logger.error(f"Failed to parse CSV response: {e}")
+            logger.error("Failed to parse CSV response: %s", e)
             raise
 
     @staticmethod
@@ -215,6 +395,25 @@ class HttpDatabaseConnection(DatabaseConnectionBase):
         else:
             raise ValueError(f"Unexpected JSON response type: {type(response_json)}")
 
+    @staticmethod
+    def _parse_query(query: str) -> Tuple[str, Dict[str, Any]]:
+        """Parse a JSON query string into its endpoint and payload."""
+        query_data = _json.loads(query)
+
+        if not isinstance(query_data, dict):
+            raise ValueError("Query must be a JSON object")
+
+        endpoint = query_data.get("endpoint", "")
+        payload = query_data.get("payload", {})
+
+        if not endpoint:
+            raise ValueError("Query must contain 'endpoint' field")
+
+        return endpoint, payload
+
+    def _wants_csv(self, payload: Dict[str, Any]) -> bool:
+        return self.base_payload.get("csv") == 1 or payload.get("csv") == 1
+
     def query(self, query: str) -> List[Dict[str, Any]]:
         """
         Execute a query against the HTTP endpoint.
@@ -223,69 +422,137 @@ class HttpDatabaseConnection(DatabaseConnectionBase):
         - payload: additional payload to merge with base_payload
         """
         try:
-            # Parse the query string as JSON
-            query_data = json.loads(query)
-
-            if not isinstance(query_data, dict):
-                raise ValueError("Query must be a JSON object")
-
-            endpoint = query_data.get("endpoint", "")
-            payload = query_data.get("payload", {})
-
-            if not endpoint:
-                raise ValueError("Query must contain 'endpoint' field")
+            endpoint, payload = self._parse_query(query)
 
             # Make the request
             response = self._make_request(endpoint, payload)
 
             # Check if we expect CSV response
-            if self.base_payload.get("csv") == 1 or payload.get("csv") == 1:
-                return self._parse_csv_response(response.text)
+            if self._wants_csv(payload):
+                return self._parse_csv_response(self._decode_response(response))
             else:
-                return self._parse_json_response(response.json())
+                return self._parse_json_response(_json.loads(response.data))
+
+        except json.JSONDecodeError as e:
+            logger.error("Invalid JSON query: %s", e)
+            raise
+        except Exception as e:
+            logger.error("Error executing HTTP query: %s", e)
+            raise
+
+    def query_many(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        """
+        Execute several queries, sending one request per endpoint when the
+        adapter has batch_supported set. A batched request posts
+        {"batch": [payload, ...]} and expects a JSON list holding one
+        result per payload, in the same order.
+        """
+        if (
+            not self.settings.batch_supported
+            or self.settings.sequential
+            or self.http_method == "get"
+        ):
+            return super().query_many(queries)
+
+        try:
+            parsed = [self._parse_query(query) for query in queries]
+            results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+
+            # CSV responses can't be split per query, so those run on their own
+            groups: Dict[str, List[int]] = {}
+            for i, (endpoint, payload) in enumerate(parsed):
+                if self._wants_csv(payload):
+                    results[i] = self.query(queries[i])
+                else:
+                    groups.setdefault(endpoint, []).append(i)
+
+            for endpoint, indices in groups.items():
+                if len(indices) == 1:
+                    results[indices[0]] = self.query(queries[indices[0]])
+                    continue
+                batch = [parsed[i][1] for i in indices]
+                response = self._make_request(endpoint, {"batch": batch})
+                response_json = _json.loads(response.data)
+                if not isinstance(response_json, list) or len(response_json) != len(
+                    indices
+                ):
+                    raise ValueError(
+                        "Batch response must be a list with one result per query"
+                    )
+                for i, item in zip(indices, response_json):
+                    results[i] = self._parse_json_response(item)
+
+            return results
 
         except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON query: {e}")
+            logger.error("Invalid JSON query: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Error executing HTTP query: {e}")
+            logger.error("Error executing HTTP batch query: %s", e)
             raise
 
     def close(self) -> None:
-        """Close the HTTP session."""
-        if self.session:
-            self.session.close()
+        """Close the pooled HTTP connections."""
+        if self.http:
+            self.http.clear()
 
 
 class DatabaseAdapter:
     def __init__(self, settings: AdapterSettings):
         self.settings = settings
         self._connection: Optional[DatabaseConnectionBase] = None
+        # Queries on one adapter may start from several threads at once
+        self._lock = threading.Lock()
 
     def _get_connection(self) -> DatabaseConnectionBase:
-        if self._connection:
+        with self._lock:
+            if self._connection:
+                return self._connection
+
+            adapter = self.settings.adapter.lower()
+
+            connection_classes = {
+                "sqlite3": SqliteDatabaseConnection,
+                "mysql": MysqlDatabaseConnection,
+                "mysql2": MysqlDatabaseConnection,
+                "http": HttpDatabaseConnection,
+            }
+
+            connection_class = connection_classes.get(adapter)
+            if not connection_class:
+                raise ValueError(f"Unsupported adapter: {self.settings.adapter}")
+
+            self._connection = connection_class(self.settings)
+
+            # Instance attributes shadow the methods below, so later calls go
+            # straight to the connection without this lookup
+            self.execute_query = self._connection.query
+            self.execute_script = self._connection.execute_script
+            self.query_many = self._connection.query_many
             return self._connection
 
-        adapter = self.settings.adapter.lower()
-
-        connection_classes = {
-            "sqlite3": SqliteDatabaseConnection,
-            "mysql": MysqlDatabaseConnection,
-            "mysql2": MysqlDatabaseConnection,
-            "http": HttpDatabaseConnection,
-        }
-
-        connection_class = connection_classes.get(adapter)
-        if not connection_class:
-            raise ValueError(f"Unsupported adapter: {self.settings.adapter}")
-
-        self._connection = connection_class(self.settings)
-        return self._connection
+    @property
+    def batches_queries(self) -> bool:
+        """True if batch_supported is set and the connection can batch in query_many."""
+        if not self.settings.batch_supported:
+            return False
+        # The base query_many runs each statement on its own (for MySQL, on
+        # its own pooled connection), so only real overrides can batch
+        connection = self._get_connection()
+        return type(connection).query_many is not DatabaseConnectionBase.query_many
 
     def execute_query(self, query: str) -> List[Dict[str, Any]]:
         connection = self._get_connection()
         return connection.query(query)
 
+    def execute_script(self, script: Union[str, Iterable[str]]) -> List[Dict[str, Any]]:
+        connection = self._get_connection()
+        return connection.execute_script(script)
+
+    def query_many(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        connection = self._get_connection()
+        return connection.query_many(queries)
+
     def close(self) -> None:
         if self._connection:
             self._connection.close()
@@ -16,6 +16,8 @@ class AdapterSettings:
     base_payload: Optional[Dict[str, Any]] = None
     base_headers: Optional[Dict[str, Any]] = None
     http_method: Optional[str] = None
+    batch_supported: Optional[bool] = None
+    sequential: Optional[bool] = None
 
 
 @dataclass
@@ -1,16 +1,51 @@
+import copy
+import functools
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 import yaml
-from jinja2 import Environment
+from jinja2 import Environment, Template, meta
 
-from .database import DatabaseAdapter
+from .database import DatabaseAdapter, iter_statements
 from .dataclass import AdapterSettings, Query, Output
 
 logger = logging.getLogger(__name__)
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Kept below the MySQL pool size so a wave never exhausts the pool
+_MAX_WORKERS = 4
+
+
+@functools.lru_cache(maxsize=64)
+def _load_config_cached(path: str, mtime_ns: int, size: int) -> Any:
+    """Parse a YAML config file. The stat fields only serve as cache key."""
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+def _is_static(env: Environment, source: str) -> bool:
+    """True if the string has no Jinja syntax under env's delimiters and renders to itself."""
+    markers = (
+        env.variable_start_string,
+        env.block_start_string,
+        env.comment_start_string,
+        env.line_statement_prefix,
+        env.line_comment_prefix,
+    )
+    # The line prefixes are None unless the environment enables them
+    return not any(marker and marker in source for marker in markers)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_template(env: Environment, source: str) -> Template:
+    """Compile a template string once per environment and reuse it."""
+    return env.from_string(source)
+
 
 class QueryProcessor:
     def __init__(
@@ -23,6 +58,9 @@ class QueryProcessor:
         self.data = initial_data or {}
         self.template_env = template_env
         self.config = self._load_config()
+        # The config doesn't change, so its sections are parsed only once
+        self.queries = [Query(**query_config) for query_config in self.config["queries"]]
+        self.output = Output(**self.config["output"])
         self.adapters: Dict[str, DatabaseAdapter] = {}
 
     def __enter__(self):
@@ -38,108 +76,195 @@ class QueryProcessor:
 
     def _load_config(self) -> Dict[str, Any]:
         try:
-            with open(self.config_path) as f:
-                config = yaml.safe_load(f)
-                if not isinstance(config, dict):
-                    raise ValueError("Config must be a dictionary")
-                required_keys = {"adapter_settings", "queries", "output"}
-                missing_keys = required_keys - set(config.keys())
-                if missing_keys:
-                    raise ValueError(
-                        f"Missing required config sections: {missing_keys}"
-                    )
-                return config
+            path = Path(self.config_path).resolve()
+            stat = path.stat()
+            # Hand out a copy so callers can't mutate the cached config
+            config = copy.deepcopy(
+                _load_config_cached(str(path), stat.st_mtime_ns, stat.st_size)
+            )
+            if not isinstance(config, dict):
+                raise ValueError("Config must be a dictionary")
+            required_keys = {"adapter_settings", "queries", "output"}
+            missing_keys = required_keys - set(config.keys())
+            if missing_keys:
+                raise ValueError(
+                    f"Missing required config sections: {missing_keys}"
+                )
+            return config
         except Exception as e:
-            logger.error(f"Error loading config file: {e}")
+            logger.error("Error loading config file: %s", e)
             raise
 
     def _process_adapter_settings(self, settings: Dict[str, Any]) -> Dict[str, Any]:
         """Process adapter settings to handle environment variables."""
         processed_settings = {}
         env_data = {'env': {k: v for k, v in os.environ.items()}}
-        logger.debug(f"Environment data: {env_data}")
+        logger.debug("Environment data: %s", env_data)
         for key, value in settings.items():
             if isinstance(value, str):
-                template = self.template_env.from_string(value)
+                template = _compile_template(self.template_env, value)
                 try:
-                    processed_value = template.render(**env_data)
+                    processed_value = template.render(env_data)
                     processed_settings[key] = processed_value
                 except Exception as e:
-                    logger.error(f"Error processing environment variable in setting {key}: {e}")
+                    logger.error("Error processing environment variable in setting %s: %s", key, e)
                     raise
             else:
                 processed_settings[key] = value
-        logger.debug(f"Processed adapter settings: {processed_settings}")
+        logger.debug("Processed adapter settings: %s", processed_settings)
         return processed_settings
 
     def _get_adapter(self, adapter_name: str) -> DatabaseAdapter:
-        if adapter_name not in self.adapters:
-            if adapter_name not in self.config["adapter_settings"]:
+        adapter = self.adapters.get(adapter_name)
+        if adapter is None:
+            settings = self.config["adapter_settings"].get(adapter_name)
+            if settings is None:
                 raise ValueError(f"Adapter settings not found for: {adapter_name}")
-            settings = self.config["adapter_settings"][adapter_name]
             processed_settings = self._process_adapter_settings(settings)
-            self.adapters[adapter_name] = DatabaseAdapter(AdapterSettings(**processed_settings))
-        return self.adapters[adapter_name]
+            adapter = DatabaseAdapter(AdapterSettings(**processed_settings))
+            self.adapters[adapter_name] = adapter
+        return adapter
 
-    def _process_query(self, query: Query) -> List[Dict[str, Any]]:
-        template = self.template_env.from_string(query.query)
+    def _render_query(self, query: Query) -> Iterator[str]:
+        """Render a query template lazily, chunk by chunk."""
+        if _is_static(self.template_env, query.query):
+            yield query.query
+            return
+
+        template = _compile_template(self.template_env, query.query)
         try:
-            logger.debug(f"Using data: {self.data}")
-            rendered_query = template.render(self.data)
+            logger.debug("Using data: %s", self.data)
+            yield from template.generate(self.data)
         except Exception as e:
-            logger.error(f"Error rendering query template: {e}")
+            logger.error("Error rendering query template: %s", e)
             raise
 
-        logger.debug(f"Executing query: {rendered_query}")
+    def _process_query(self, query: Query) -> List[Dict[str, Any]]:
         adapter = self._get_adapter(query.adapter)
 
-        # Split multiple queries if present
-        queries = [q.strip() for q in rendered_query.split(";") if q.strip()]
-        results = []
+        # Multiple ';'-separated statements are rendered, then run in one batch
+        return adapter.execute_script(self._render_query(query))
 
-        for single_query in queries:
-            if single_query:
-                result = adapter.execute_query(single_query.strip())
-                results.extend(result)
+    def _process_batch(self, queries: List[Query]) -> List[List[Dict[str, Any]]]:
+        """Run queries sharing a batching adapter through one query_many call."""
+        adapter = self._get_adapter(queries[0].adapter)
+        statements, owners = [], []
+        for i, query in enumerate(queries):
+            for statement in iter_statements(self._render_query(query)):
+                statements.append(statement)
+                owners.append(i)
 
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for owner, rows in zip(owners, adapter.query_many(statements)):
+            results[owner].extend(rows)
         return results
 
+    def _plan_waves(self, queries: List[Query]) -> List[List[Query]]:
+        """
+        Group queries into waves whose members can run concurrently.
+        A query lands in a later wave than any earlier query whose results
+        it references, and never in an earlier wave than a previous query
+        touching the same top-level data key, so the final data matches
+        sequential execution. Queries on a sequential adapter also keep
+        their config order.
+        """
+        waves: List[List[Query]] = []
+        planned = []  # (wave index, produced key, referenced names, sequential adapter)
+        for query in queries:
+            produces = query.table.split(".", 1)[0]
+            references = (
+                set()
+                if _is_static(self.template_env, query.query)
+                else meta.find_undeclared_variables(self.template_env.parse(query.query))
+            )
+            sequential = (
+                query.adapter if self._get_adapter(query.adapter).settings.sequential else None
+            )
+            wave = 0
+            for prev_wave, prev_produces, prev_references, prev_sequential in planned:
+                if prev_produces in references:
+                    wave = max(wave, prev_wave + 1)
+                elif (
+                    produces == prev_produces
+                    or produces in prev_references
+                    or (sequential and sequential == prev_sequential)
+                ):
+                    wave = max(wave, prev_wave)
+            planned.append((wave, produces, references, sequential))
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(query)
+        return waves
+
+    def _run_wave(self, wave: List[Query]) -> List[List[Dict[str, Any]]]:
+        if len(wave) == 1:
+            return [self._process_query(wave[0])]
+
+        # Create adapters up front so worker threads never race on self.adapters.
+        # Sibling queries on an adapter that supports batching, or that must
+        # run sequentially, form one group.
+        groups: List[List[int]] = []
+        batches: Dict[str, List[int]] = {}
+        for i, query in enumerate(wave):
+            adapter = self._get_adapter(query.adapter)
+            if adapter.batches_queries or adapter.settings.sequential:
+                if query.adapter not in batches:
+                    batches[query.adapter] = []
+                    groups.append(batches[query.adapter])
+                batches[query.adapter].append(i)
+            else:
+                groups.append([i])
+
+        group_queries = [[wave[i] for i in group] for group in groups]
+        if len(groups) == 1:
+            outputs = [self._run_group(group_queries[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(groups))) as executor:
+                outputs = list(executor.map(self._run_group, group_queries))
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in wave]
+        for group, output in zip(groups, outputs):
+            for i, rows in zip(group, output):
+                results[i] = rows
+        return results
+
+    def _run_group(self, queries: List[Query]) -> List[List[Dict[str, Any]]]:
+        if len(queries) == 1 or self._get_adapter(queries[0].adapter).settings.sequential:
+            return [self._process_query(query) for query in queries]
+        return self._process_batch(queries)
+
     def _update_data_structure(self, table: str, results: List[Dict[str, Any]]) -> None:
-        parts = table.split(".")
+        value = results[0] if len(results) == 1 else results
 
-        if len(parts) == 1:
+        if "." not in table:
             # Case: table_name
-            self.data[parts[0]] = results[0] if len(results) == 1 else results
-        else:
-            # Cases: db.table_name or db.alias.table_name
-            db = parts[0]
-            table_name = parts[-1]  # Last part is always the table name
+            self.data[table] = value
+            return
 
-            if db not in self.data:
-                self.data[db] = {}
+        # Cases: db.table_name or db.alias.table_name
+        prefix, table_name = table.rsplit(".", 1)  # Last part is always the table name
 
-            current = self.data[db]
-            # Navigate through intermediate parts if any
-            for part in parts[1:-1]:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
+        current = self.data
+        # Navigate through db and intermediate parts if any
+        for part in prefix.split("."):
+            current = current.setdefault(part, {})
 
-            current[table_name] = results[0] if len(results) == 1 else results
+        current[table_name] = value
 
     def process(self) -> str:
         try:
-            for query_config in self.config["queries"]:
-                query = Query(**query_config)
-                results = self._process_query(query)
-                self._update_data_structure(query.table, results)
-
-            output = Output(**self.config["output"])
-            template = self.template_env.from_string(output.template)
-            context = {**self.data, "template_context": output.template_context}
-            return template.render(**context).strip()
+            for wave in self._plan_waves(self.queries):
+                # Results are merged serially, in config order
+                for query, results in zip(wave, self._run_wave(wave)):
+                    self._update_data_structure(query.table, results)
+
+            template = _compile_template(self.template_env, self.output.template)
+            # Jinja copies the mapping itself, so skip building a merged copy here
+            return template.render(
+                self.data, template_context=self.output.template_context
+            ).strip()
         except Exception as e:
-            logger.error(f"Error processing queries: {e}")
+            logger.error("Error processing queries: %s", e)
             raise
         finally:
             self.close()
@@ -1,7 +1,11 @@
 import logging
-from typing import Any, Dict
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 
-from jinja2 import Environment
+from jinja2 import Environment, pass_context
+from jinja2.runtime import Context
 
 logger = logging.getLogger(__name__)
 
@@ -17,47 +21,116 @@ def parse_initial_data(initial_data: str) -> Dict[str, Any]:
             result[key.strip()] = value.strip()
         return result
     except ValueError as e:
-        logger.error(f"Invalid initial data format: {e}")
+        logger.error("Invalid initial data format: %s", e)
         raise ValueError("Initial data must be in format: key1=value1,key2=value2")
 
 
-def get_template_environment() -> Environment:
-    def find_by_key_value(haystack, key, value, default=None):
-        """
-        Finds an item in a list or dictionary by key and value.
-        Returns the item if found, otherwise returns the default value.
-
-        Parameters:
-        haystack (list or dict): The list or dictionary to search.
-        key (str): The key to search for.
-        value (any): The value to search for.
-        default (any): The default value to return if the item is not found.
-
-        Returns:
-        any: The item found, or the default value if not found.
-
-        Example:
-            {{ db2.transaction_information | find_by_key_value('transaction_id', db2.transactions[0].id) }}
-        Gets the transaction information for the first transaction in the db2.transactions list.
-        """
-        if isinstance(haystack, list):
-            output = []
-            for item in haystack:
-                if key in item and item[key] == value:
-                    output.append(item)
-            if output:
-                return output
-            return default
-        elif isinstance(haystack, dict):
-            if key in haystack and haystack[key] == value:
-                return haystack
-            return default
-        else:
-            return default
+# Sentinel so a missing key never compares equal to the searched value
+_MISSING = object()
+
+# find_by_key_value indexes, per render context and keyed by (id(list), key).
+# Each context keeps at most _MAX_RENDER_INDEXES entries, least recently used
+# first out. The context is usually freed when its render finishes, but with
+# macros it can sit in a reference cycle until the garbage collector runs, so
+# the cap is what bounds the memory held.
+_MAX_RENDER_INDEXES = 8
+_render_indexes: "weakref.WeakKeyDictionary[Context, OrderedDict]" = (
+    weakref.WeakKeyDictionary()
+)
+_render_indexes_lock = threading.Lock()
+
+# Marks a (list, key) pair looked up once; it holds no reference to the list
+_SEEN_ONCE = object()
+
+
+def _key_index(
+    context: Context, haystack: list, key: Any
+) -> Optional[Dict[Any, List[Any]]]:
+    """
+    Map each value of `key` in haystack to the items holding it, reusing the
+    index for later lookups on the same list within one render. The index is
+    only built on the second lookup, so lists filtered once (such as
+    temporaries built inside a loop) are scanned and never kept alive.
+    Returns None when the list should be scanned instead.
+    """
+    cache_key = (id(haystack), key)
+    with _render_indexes_lock:
+        indexes = _render_indexes.get(context)
+        if indexes is None:
+            indexes = _render_indexes[context] = OrderedDict()
+        entry = indexes.get(cache_key)
+        if entry is None:
+            indexes[cache_key] = _SEEN_ONCE
+            if len(indexes) > _MAX_RENDER_INDEXES:
+                indexes.popitem(last=False)
+            return None
+        indexes.move_to_end(cache_key)
+    # A built entry keeps its list alive, so the id can't be reused meanwhile
+    if entry is not _SEEN_ONCE and entry[0] is haystack and entry[1] == len(haystack):
+        return entry[2]
+
+    index: Optional[Dict[Any, List[Any]]] = {}
+    try:
+        for item in haystack:
+            # Non-dict items (e.g. scalars in a JSON array) never match
+            if not isinstance(item, dict):
+                continue
+            item_value = item.get(key, _MISSING)
+            if item_value is not _MISSING:
+                index.setdefault(item_value, []).append(item)
+    except TypeError:
+        index = None
+
+    with _render_indexes_lock:
+        indexes[cache_key] = (haystack, len(haystack), index)
+    return index
 
+
+@pass_context
+def find_by_key_value(context, haystack, key, value, default=None):
+    """
+    Finds an item in a list or dictionary by key and value.
+    Returns the item if found, otherwise returns the default value.
+
+    Parameters:
+    haystack (list or dict): The list or dictionary to search.
+    key (str): The key to search for.
+    value (any): The value to search for.
+    default (any): The default value to return if the item is not found.
+
+    Returns:
+    any: The item found, or the default value if not found.
+
+    Example:
+        {{ db2.transaction_information | find_by_key_value('transaction_id', db2.transactions[0].id) }}
+    Gets the transaction information for the first transaction in the db2.transactions list.
+    """
+    if isinstance(haystack, list):
+        try:
+            index = _key_index(context, haystack, key)
+            if index is not None:
+                matches = index.get(value)
+                return list(matches) if matches else default
+        except TypeError:
+            pass
+        # First lookups on a list, and unhashable keys or values, scan instead
+        output = [
+            item
+            for item in haystack
+            if isinstance(item, dict) and item.get(key, _MISSING) == value
+        ]
+        return output or default
+    elif isinstance(haystack, dict):
+        return haystack if haystack.get(key, _MISSING) == value else default
+    else:
+        return default
+
+
+def get_template_environment() -> Environment:
     env = Environment(
         trim_blocks=True,
         lstrip_blocks=True,
+        auto_reload=False,  # templates never change while the process runs
     )
     env.filters["find_by_key_value"] = find_by_key_value
     return env